@@ -0,0 +1,131 @@
+package main
+
+import (
+	"hash/maphash"
+	"sync"
+	"time"
+)
+
+const (
+	// eventCacheMinSize is the initial ring capacity; the cache never
+	// shrinks below it.
+	eventCacheMinSize = 64
+
+	// eventCacheMaxSize caps how many live event IDs are remembered. It is
+	// a memory safety net only: below it, IDs are kept for the full TTL
+	// however fast they arrive.
+	eventCacheMaxSize = 100000
+
+	// eventCacheTTL is how long an event ID is remembered. Feishu
+	// redelivers unacknowledged events within seconds.
+	eventCacheTTL = time.Minute
+)
+
+// seenEvent is an event ID fingerprint with the time it was first processed.
+type seenEvent struct {
+	key uint64
+	at  time.Time
+}
+
+// eventCache remembers recently processed event IDs so that events
+// redelivered by Feishu are forwarded only once. IDs expire after ttl, so
+// memory follows arrival rate × ttl: the ring doubles while it is full of
+// live IDs and halves once expiry leaves it mostly empty. Only at maxSize
+// live IDs is the oldest dropped before its ttl.
+//
+// IDs are stored as 64-bit fingerprints: lookups hit the map's integer
+// fast path and no ID strings are retained. With at most maxSize live
+// entries a false duplicate is vanishingly unlikely.
+//
+// The lark SDK invokes event handlers on separate goroutines, so all
+// access goes through mu.
+type eventCache struct {
+	mu      sync.Mutex
+	seed    maphash.Seed
+	ttl     time.Duration
+	maxSize int
+	now     func() time.Time
+	ring    []seenEvent // live IDs in arrival order, starting at head
+	head    int
+	count   int
+	keys    map[uint64]struct{}
+}
+
+// newEventCache creates an eventCache holding IDs for ttl, with at most
+// maxSize live at once.
+func newEventCache(maxSize int, ttl time.Duration) *eventCache {
+	size := eventCacheMinSize
+	if size > maxSize {
+		size = maxSize
+	}
+	return &eventCache{
+		seed:    maphash.MakeSeed(),
+		ttl:     ttl,
+		maxSize: maxSize,
+		now:     time.Now,
+		ring:    make([]seenEvent, size),
+		keys:    make(map[uint64]struct{}, size),
+	}
+}
+
+// seen reports whether id was recorded within the last ttl, recording it
+// otherwise. id must not be empty.
+func (c *eventCache) seen(id string) bool {
+	key := maphash.String(c.seed, id)
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	now := c.now()
+
+	// The ring is in arrival order, so expired IDs are all at the head
+	for c.count > 0 && now.Sub(c.ring[c.head].at) >= c.ttl {
+		c.evictOldest()
+	}
+	if len(c.ring) > eventCacheMinSize && c.count < len(c.ring)/4 {
+		c.resize(len(c.ring) / 2)
+	}
+
+	if _, ok := c.keys[key]; ok {
+		return true
+	}
+
+	if c.count == len(c.ring) {
+		if len(c.ring) < c.maxSize {
+			c.resize(min(2*len(c.ring), c.maxSize))
+		} else {
+			c.evictOldest()
+		}
+	}
+	c.ring[(c.head+c.count)%len(c.ring)] = seenEvent{key: key, at: now}
+	c.count++
+	c.keys[key] = struct{}{}
+	return false
+}
+
+// evictOldest forgets the ID at the head of the ring. c.mu must be held.
+func (c *eventCache) evictOldest() {
+	delete(c.keys, c.ring[c.head].key)
+	c.ring[c.head] = seenEvent{}
+	c.head = (c.head + 1) % len(c.ring)
+	c.count--
+}
+
+// resize moves the live IDs into a ring of the given capacity, which must
+// be at least c.count. When shrinking, the key map is rebuilt too, since
+// Go maps keep their buckets after deletes. c.mu must be held.
+func (c *eventCache) resize(size int) {
+	ring := make([]seenEvent, size)
+	for i := 0; i < c.count; i++ {
+		ring[i] = c.ring[(c.head+i)%len(c.ring)]
+	}
+	if size < len(c.ring) {
+		keys := make(map[uint64]struct{}, size)
+		for _, e := range ring[:c.count] {
+			keys[e.key] = struct{}{}
+		}
+		c.keys = keys
+	}
+	c.ring = ring
+	c.head = 0
+}
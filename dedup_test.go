@@ -0,0 +1,144 @@
+package main
+
+import (
+	"fmt"
+	"testing"
+	"time"
+)
+
+// fakeClock is a manually advanced time source for eventCache.
+type fakeClock struct{ t time.Time }
+
+func (f *fakeClock) now() time.Time { return f.t }
+
+func newTestCache(maxSize int, ttl time.Duration) (*eventCache, *fakeClock) {
+	clock := &fakeClock{t: time.Unix(0, 0)}
+	c := newEventCache(maxSize, ttl)
+	c.now = clock.now
+	return c, clock
+}
+
+// checkConsistent verifies the ring and key map agree.
+func checkConsistent(t *testing.T, c *eventCache) {
+	t.Helper()
+	if c.count != len(c.keys) {
+		t.Fatalf("count = %d, len(keys) = %d", c.count, len(c.keys))
+	}
+	if c.count > len(c.ring) {
+		t.Fatalf("count = %d exceeds ring capacity %d", c.count, len(c.ring))
+	}
+	for i := 0; i < c.count; i++ {
+		e := c.ring[(c.head+i)%len(c.ring)]
+		if _, ok := c.keys[e.key]; !ok {
+			t.Fatalf("ring slot %d holds a key missing from keys", i)
+		}
+	}
+}
+
+func TestEventCacheSeen(t *testing.T) {
+	type step struct {
+		advance time.Duration // clock moves forward before the lookup
+		id      string
+		want    bool
+	}
+	tests := []struct {
+		name    string
+		maxSize int
+		steps   []step
+	}{
+		{
+			name:    "duplicate within ttl is suppressed",
+			maxSize: 10,
+			steps: []step{
+				{0, "a", false},
+				{30 * time.Second, "a", true},
+				{29 * time.Second, "a", true},
+			},
+		},
+		{
+			name:    "id is forgotten after ttl",
+			maxSize: 10,
+			steps: []step{
+				{0, "a", false},
+				{0, "b", false},
+				{time.Minute, "a", false},
+				{0, "b", false},
+				{0, "a", true},
+			},
+		},
+		{
+			name:    "oldest id is evicted at the cap",
+			maxSize: 3,
+			steps: []step{
+				{0, "a", false},
+				{0, "b", false},
+				{0, "c", false},
+				{0, "d", false},
+				{0, "b", true},
+				{0, "d", true},
+				{0, "a", false},
+			},
+		},
+		{
+			name:    "wraparound keeps ring and keys consistent",
+			maxSize: 4,
+			steps: []step{
+				{0, "a", false},
+				{0, "b", false},
+				{10 * time.Second, "c", false},
+				{10 * time.Second, "d", false},
+				{0, "e", false},
+				{0, "f", false},
+				{45 * time.Second, "g", false},
+				{0, "e", true},
+				{0, "a", false},
+				{0, "h", false},
+				{0, "c", false},
+			},
+		},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			c, clock := newTestCache(tt.maxSize, time.Minute)
+			for i, s := range tt.steps {
+				clock.t = clock.t.Add(s.advance)
+				if got := c.seen(s.id); got != s.want {
+					t.Fatalf("step %d: seen(%q) = %v, want %v", i, s.id, got, s.want)
+				}
+				checkConsistent(t, c)
+			}
+		})
+	}
+}
+
+func TestEventCacheGrowsWithinTTLAndShrinksAfter(t *testing.T) {
+	c, clock := newTestCache(eventCacheMaxSize, time.Minute)
+
+	// A burst well past the initial capacity keeps every ID for the TTL
+	const burst = 10 * eventCacheMinSize
+	for i := 0; i < burst; i++ {
+		if c.seen(fmt.Sprint(i)) {
+			t.Fatalf("seen(%d) = true on first delivery", i)
+		}
+	}
+	for i := 0; i < burst; i++ {
+		if !c.seen(fmt.Sprint(i)) {
+			t.Fatalf("redelivery of %d within ttl was not suppressed", i)
+		}
+	}
+	checkConsistent(t, c)
+	if len(c.ring) < burst {
+		t.Fatalf("ring capacity %d did not grow to hold %d live IDs", len(c.ring), burst)
+	}
+
+	// Once the burst expires, trickling events shrink the ring back down
+	clock.t = clock.t.Add(time.Minute)
+	for i := 0; i < 10; i++ {
+		c.seen(fmt.Sprint("late-", i))
+	}
+	checkConsistent(t, c)
+	if len(c.ring) >= burst {
+		t.Fatalf("ring capacity %d did not shrink after expiry", len(c.ring))
+	}
+}
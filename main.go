@@ -16,6 +16,8 @@ import (
 	"fmt"
 	"net/http"
 	"os"
+	"os/signal"
+	"syscall"
 	"time"
 
 	larkcore "github.com/larksuite/oapi-sdk-go/v3/core"
@@ -28,7 +30,12 @@ import (
 
 // cardActionEvent mirrors the actual Feishu card.action.trigger event payload.
 type cardActionEvent struct {
-	Event cardEventBody `json:"event"`
+	Header cardEventHeader `json:"header"`
+	Event  cardEventBody   `json:"event"`
+}
+
+type cardEventHeader struct {
+	EventID string `json:"event_id"`
 }
 
 type cardEventBody struct {
@@ -42,13 +49,47 @@ type cardOperator struct {
 }
 
 type cardAction struct {
-	Value map[string]interface{} `json:"value"`
+	Value json.RawMessage `json:"value"`
 }
 
 type cardContext struct {
 	OpenMessageID string `json:"open_message_id"`
 }
 
+// cardCallback is the message forwarded to the WS client for a card action.
+type cardCallback struct {
+	Type          string             `json:"type"`
+	OpenMessageID string             `json:"open_message_id"`
+	Action        cardCallbackAction `json:"action"`
+}
+
+type cardCallbackAction struct {
+	Value  json.RawMessage `json:"value"`
+	OpenID string          `json:"open_id"`
+}
+
+const (
+	// forwardQueueSize bounds how many card callbacks may wait for delivery
+	// before new ones are dropped.
+	forwardQueueSize = 1024
+
+	// shutdownTimeout bounds how long the WS server and its clients may
+	// take to stop.
+	shutdownTimeout = 5 * time.Second
+)
+
+// cardHandler holds the state shared by card.action.trigger events.
+type cardHandler struct {
+	events   *eventCache
+	forwards chan forwardJob
+}
+
+// forwardJob is a card callback waiting to be delivered to a WS client.
+type forwardJob struct {
+	clientID string
+	message  *cardCallback
+}
+
 func main() {
 	appID := mustEnv("APP_ID")
 	appSecret := mustEnv("APP_SECRET")
@@ -57,15 +98,23 @@ func main() {
 	// Initialize WebSocket hub for client connections
 	hub := wsserver.NewHub()
 
+	handler := &cardHandler{
+		// Remember recent event IDs so Feishu redeliveries are forwarded once
+		events: newEventCache(eventCacheMaxSize, eventCacheTTL),
+		// Deliver card callbacks off the SDK's event goroutines
+		forwards: make(chan forwardJob, forwardQueueSize),
+	}
+	go forwardLoop(handler.forwards, hub)
+
 	// Start HTTP server for WebSocket connections.
 	// The public ingress exposes this service under /feishu/ws.
-	go func() {
-		mux := http.NewServeMux()
-		mux.HandleFunc("/feishu/ws", hub.HandleWS)
+	mux := http.NewServeMux()
+	mux.HandleFunc("/feishu/ws", hub.HandleWS)
+	srv := &http.Server{Addr: ":" + wsPort, Handler: mux}
 
-		addr := ":" + wsPort
-		fmt.Printf("[feishu-agent] WebSocket server listening on %s\n", addr)
-		if err := http.ListenAndServe(addr, mux); err != nil {
+	go func() {
+		fmt.Printf("[feishu-agent] WebSocket server listening on %s\n", srv.Addr)
+		if err := srv.ListenAndServe(); err != nil && err != http.ErrServerClosed {
 			fmt.Fprintf(os.Stderr, "[feishu-agent] WebSocket server error: %v\n", err)
 			os.Exit(1)
 		}
@@ -73,9 +122,7 @@ func main() {
 
 	// Register event dispatcher: subscribe to card.action.trigger
 	eventHandler := dispatcher.NewEventDispatcher("", "").
-		OnCustomizedEvent("card.action.trigger", func(ctx context.Context, event *larkevent.EventReq) error {
-			return handleCardAction(ctx, event, hub)
-		})
+		OnCustomizedEvent("card.action.trigger", handler.handleCardAction)
 
 	// Create the Feishu long-connection WebSocket client
 	cli := larkws.NewClient(appID, appSecret,
@@ -83,14 +130,48 @@ func main() {
 		larkws.WithLogLevel(larkcore.LogLevelInfo),
 	)
 
-	// Exponential backoff retry loop — keeps the container alive on transient errors
+	// Stop on SIGINT/SIGTERM instead of waiting out a retry backoff
+	ctx, stop := signal.NotifyContext(context.Background(), os.Interrupt, syscall.SIGTERM)
+
+	go runFeishuClient(ctx, cli)
+
+	<-ctx.Done()
+	// Restore default signal handling so a second signal kills the process
+	stop()
+	fmt.Println("[feishu-agent] shutting down")
+
+	// Close the listener, then send every connected WS client a close frame.
+	// srv.Shutdown does not track hijacked WebSocket connections, so the
+	// hub closes those itself.
+	shutdownCtx, cancel := context.WithTimeout(context.Background(), shutdownTimeout)
+	defer cancel()
+	if err := srv.Shutdown(shutdownCtx); err != nil {
+		fmt.Fprintf(os.Stderr, "[feishu-agent] WebSocket server shutdown error: %v\n", err)
+	}
+	if err := hub.Close(shutdownCtx); err != nil {
+		fmt.Fprintf(os.Stderr, "[feishu-agent] WebSocket client shutdown error: %v\n", err)
+	}
+}
+
+// runFeishuClient keeps the Feishu long connection up, retrying with
+// exponential backoff on transient errors until ctx is cancelled.
+func runFeishuClient(ctx context.Context, cli *larkws.Client) {
 	backoff := 5 * time.Second
 	const maxBackoff = 5 * time.Minute
-	for {
+	for ctx.Err() == nil {
 		fmt.Println("[feishu-agent] connecting to Feishu via long-connection WebSocket...")
-		if err := cli.Start(context.Background()); err != nil {
+		if err := cli.Start(ctx); err != nil {
+			if ctx.Err() != nil {
+				return
+			}
 			fmt.Fprintf(os.Stderr, "[feishu-agent] connection error: %v — retrying in %s\n", err, backoff)
-			time.Sleep(backoff)
+			timer := time.NewTimer(backoff)
+			select {
+			case <-ctx.Done():
+				timer.Stop()
+				return
+			case <-timer.C:
+			}
 			backoff *= 2
 			if backoff > maxBackoff {
 				backoff = maxBackoff
@@ -101,10 +182,11 @@ func main() {
 	}
 }
 
-// handleCardAction parses card.action.trigger and forwards it to the
-// WebSocket client identified by client_id in action.value.
-func handleCardAction(ctx context.Context, event *larkevent.EventReq, hub *wsserver.Hub) error {
-	fmt.Printf("[feishu-agent] card.action.trigger received, body=%s\n", string(event.Body))
+// handleCardAction parses card.action.trigger and queues it for the
+// WebSocket client identified by client_id in action.value. Events whose
+// event_id was already handled are acknowledged without forwarding.
+func (h *cardHandler) handleCardAction(ctx context.Context, event *larkevent.EventReq) error {
+	fmt.Printf("[feishu-agent] card.action.trigger received, body=%s\n", event.Body)
 
 	var payload cardActionEvent
 	if err := json.Unmarshal(event.Body, &payload); err != nil {
@@ -112,40 +194,75 @@ func handleCardAction(ctx context.Context, event *larkevent.EventReq, hub *wsser
 		return nil
 	}
 
-	// Extract client_id from action.value
-	clientID, _ := payload.Event.Action.Value["client_id"].(string)
+	if id := payload.Header.EventID; id != "" && h.events.seen(id) {
+		fmt.Printf("[feishu-agent] skipping duplicate event: %s\n", id)
+		return nil
+	}
+
+	// Extract client_id from action.value. Only its top-level keys are
+	// split out; the value itself is forwarded to the client undecoded.
+	var value map[string]json.RawMessage
+	if len(payload.Event.Action.Value) > 0 {
+		if err := json.Unmarshal(payload.Event.Action.Value, &value); err != nil {
+			fmt.Printf("[feishu-agent] failed to parse action.value: %v\n", err)
+			return nil
+		}
+	}
+
+	// A non-string client_id fails to decode and is treated as missing
+	var clientID string
+	if raw, ok := value["client_id"]; ok {
+		if err := json.Unmarshal(raw, &clientID); err != nil {
+			clientID = ""
+		}
+	}
 	if clientID == "" {
 		fmt.Printf("[feishu-agent] no client_id in action.value, skipping WS forward\n")
 		return nil
 	}
 
 	// Build the message to forward to the WebSocket client
-	forward := map[string]interface{}{
-		"type":            "card_callback",
-		"open_message_id": payload.Event.Context.OpenMessageID,
-		"action": map[string]interface{}{
-			"value":   payload.Event.Action.Value,
-			"open_id": payload.Event.Operator.OpenID,
+	forward := &cardCallback{
+		Type:          "card_callback",
+		OpenMessageID: payload.Event.Context.OpenMessageID,
+		Action: cardCallbackAction{
+			Value:  payload.Event.Action.Value,
+			OpenID: payload.Event.Operator.OpenID,
 		},
 	}
 
+	// decision is only logged, so decode it into the same form as before
+	var decision interface{}
+	if raw, ok := value["decision"]; ok {
+		_ = json.Unmarshal(raw, &decision) // raw was validated by the parse above
+	}
+
 	fmt.Printf("[feishu-agent] forwarding to WS client %s: decision=%v open_id=%v msg_id=%v\n",
 		clientID,
-		payload.Event.Action.Value["decision"],
+		decision,
 		payload.Event.Operator.OpenID,
 		payload.Event.Context.OpenMessageID,
 	)
 
-	// Forward to WS client asynchronously — return nil first to ACK Feishu
-	go func() {
-		if err := hub.SendToClient(clientID, forward); err != nil {
-			fmt.Printf("[feishu-agent] failed to forward to WS client: %v\n", err)
-		}
-	}()
+	// Queue for delivery without blocking — return nil first to ACK Feishu
+	select {
+	case h.forwards <- forwardJob{clientID: clientID, message: forward}:
+	default:
+		fmt.Printf("[feishu-agent] forward queue full, dropping callback for WS client %s\n", clientID)
+	}
 
 	return nil
 }
 
+// forwardLoop delivers queued card callbacks to their WebSocket clients.
+func forwardLoop(jobs <-chan forwardJob, hub *wsserver.Hub) {
+	for job := range jobs {
+		if err := hub.SendToClient(job.clientID, job.message); err != nil {
+			fmt.Printf("[feishu-agent] failed to forward to WS client: %v\n", err)
+		}
+	}
+}
+
 func mustEnv(key string) string {
 	v := os.Getenv(key)
 	if v == "" {
@@ -0,0 +1,115 @@
+package main
+
+import (
+	"context"
+	"encoding/json"
+	"fmt"
+	"strings"
+	"testing"
+	"time"
+
+	larkevent "github.com/larksuite/oapi-sdk-go/v3/event"
+)
+
+// cardEvent builds a card.action.trigger body with the given raw
+// action.value JSON.
+func cardEvent(eventID, value string) *larkevent.EventReq {
+	body := `{"header":{"event_id":"` + eventID + `"},"event":{` +
+		`"operator":{"open_id":"ou_1"},` +
+		`"action":{"value":` + value + `},` +
+		`"context":{"open_message_id":"om_1"}}}`
+	return &larkevent.EventReq{Body: []byte(body)}
+}
+
+func TestHandleCardActionRouting(t *testing.T) {
+	tests := []struct {
+		name     string
+		value    string
+		clientID string // empty means nothing is queued
+	}{
+		{
+			name:     "exact client_id routes",
+			value:    `{"client_id":"c1","decision":"approve"}`,
+			clientID: "c1",
+		},
+		{
+			name:  "client_id key is case-sensitive",
+			value: `{"Client_ID":"c1","decision":"approve"}`,
+		},
+		{
+			name:  "non-object value is skipped",
+			value: `"c1"`,
+		},
+		{
+			name:  "null value has no client",
+			value: `null`,
+		},
+		{
+			name:  "non-string client_id is treated as missing",
+			value: `{"client_id":42}`,
+		},
+		{
+			name:     "value is forwarded verbatim",
+			value:    `{"client_id":"c1","n":12345678901234567890,"nested":{"k":[1,2]}}`,
+			clientID: "c1",
+		},
+	}
+
+	for i, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			h := &cardHandler{
+				events:   newEventCache(eventCacheMaxSize, eventCacheTTL),
+				forwards: make(chan forwardJob, 1),
+			}
+			if err := h.handleCardAction(context.Background(), cardEvent(fmt.Sprint("ev_", i), tt.value)); err != nil {
+				t.Fatalf("handleCardAction returned %v", err)
+			}
+
+			var job forwardJob
+			select {
+			case job = <-h.forwards:
+			default:
+				if tt.clientID != "" {
+					t.Fatalf("nothing queued, want callback for %q", tt.clientID)
+				}
+				return
+			}
+			if tt.clientID == "" {
+				t.Fatalf("queued callback for %q, want none", job.clientID)
+			}
+
+			if job.clientID != tt.clientID {
+				t.Errorf("clientID = %q, want %q", job.clientID, tt.clientID)
+			}
+			if got := string(job.message.Action.Value); got != tt.value {
+				t.Errorf("action.value = %s, want %s", got, tt.value)
+			}
+			if job.message.Type != "card_callback" || job.message.OpenMessageID != "om_1" || job.message.Action.OpenID != "ou_1" {
+				t.Errorf("unexpected envelope: %+v", job.message)
+			}
+			data, err := json.Marshal(job.message)
+			if err != nil {
+				t.Fatalf("marshal callback: %v", err)
+			}
+			if !strings.Contains(string(data), `"value":`+tt.value) {
+				t.Errorf("marshalled callback %s does not carry value %s verbatim", data, tt.value)
+			}
+		})
+	}
+}
+
+func TestHandleCardActionSkipsDuplicateEvent(t *testing.T) {
+	h := &cardHandler{
+		events:   newEventCache(eventCacheMaxSize, time.Minute),
+		forwards: make(chan forwardJob, 2),
+	}
+	event := cardEvent("ev_1", `{"client_id":"c1"}`)
+	for i := 0; i < 2; i++ {
+		if err := h.handleCardAction(context.Background(), event); err != nil {
+			t.Fatalf("handleCardAction returned %v", err)
+		}
+	}
+	if n := len(h.forwards); n != 1 {
+		t.Fatalf("queued %d callbacks for a redelivered event, want 1", n)
+	}
+}
@@ -3,6 +3,7 @@
 package wsserver
 
 import (
+	"context"
 	"encoding/json"
 	"fmt"
 	"net/http"
@@ -27,8 +28,17 @@ const (
 	maxMessageSize = 4096
 )
 
+// Pre-serialized parts of the "connected" message sent to new clients.
+const (
+	welcomePrefix = `{"client_id":"`
+	welcomeSuffix = `","type":"connected"}`
+)
+
 var upgrader = websocket.Upgrader{
 	CheckOrigin: func(r *http.Request) bool { return true },
+	// Share write buffers between connections instead of holding one per
+	// mostly idle client.
+	WriteBufferPool: &sync.Pool{},
 }
 
 // Client represents a connected WebSocket client.
@@ -43,6 +53,8 @@ type Client struct {
 type Hub struct {
 	mu      sync.RWMutex
 	clients map[string]*Client
+	closed  bool
+	pumps   sync.WaitGroup // running writePumps
 }
 
 // NewHub creates a new Hub instance.
@@ -52,12 +64,20 @@ func NewHub() *Hub {
 	}
 }
 
-// register adds a new client to the hub.
-func (h *Hub) register(c *Client) {
+// register adds a new client to the hub and counts its writePump as
+// running. It returns false once the hub is closed.
+func (h *Hub) register(c *Client) bool {
 	h.mu.Lock()
+	if h.closed {
+		h.mu.Unlock()
+		return false
+	}
 	h.clients[c.ID] = c
+	h.pumps.Add(1)
+	total := len(h.clients)
 	h.mu.Unlock()
-	fmt.Printf("[ws-server] client registered: %s (total: %d)\n", c.ID, h.clientCount())
+	fmt.Printf("[ws-server] client registered: %s (total: %d)\n", c.ID, total)
+	return true
 }
 
 // unregister removes a client from the hub and closes its send channel.
@@ -67,36 +87,65 @@ func (h *Hub) unregister(id string) {
 		close(c.send)
 		delete(h.clients, id)
 	}
+	total := len(h.clients)
 	h.mu.Unlock()
-	fmt.Printf("[ws-server] client unregistered: %s (total: %d)\n", id, h.clientCount())
+	fmt.Printf("[ws-server] client unregistered: %s (total: %d)\n", id, total)
 }
 
-func (h *Hub) clientCount() int {
-	h.mu.RLock()
-	defer h.mu.RUnlock()
-	return len(h.clients)
+// Close unregisters every client, so each writePump sends a close frame,
+// and refuses new ones. It waits for the write pumps to finish or for ctx
+// to be done, whichever comes first.
+func (h *Hub) Close(ctx context.Context) error {
+	h.mu.Lock()
+	h.closed = true
+	for id, c := range h.clients {
+		close(c.send)
+		delete(h.clients, id)
+	}
+	h.mu.Unlock()
+
+	done := make(chan struct{})
+	go func() {
+		h.pumps.Wait()
+		close(done)
+	}()
+	select {
+	case <-done:
+		return nil
+	case <-ctx.Done():
+		return ctx.Err()
+	}
 }
 
 // SendToClient sends a JSON message to the client with the given ID.
 // Returns an error if the client is not found.
 func (h *Hub) SendToClient(id string, message interface{}) error {
-	data, err := json.Marshal(message)
-	if err != nil {
-		return fmt.Errorf("marshal message: %w", err)
-	}
-
 	h.mu.RLock()
 	c, ok := h.clients[id]
 	h.mu.RUnlock()
 
+	// Look the client up first so callbacks for gone clients skip marshalling
 	if !ok {
 		return fmt.Errorf("client %s not found", id)
 	}
 
+	data, err := json.Marshal(message)
+	if err != nil {
+		return fmt.Errorf("marshal message: %w", err)
+	}
+
+	// Send under the read lock so unregister cannot close c.send meanwhile
+	h.mu.RLock()
+	if h.clients[id] != c {
+		h.mu.RUnlock()
+		return fmt.Errorf("client %s not found", id)
+	}
 	select {
 	case c.send <- data:
+		h.mu.RUnlock()
 		return nil
 	default:
+		h.mu.RUnlock()
 		// send buffer full, drop the client
 		h.unregister(id)
 		return fmt.Errorf("client %s send buffer full, disconnected", id)
@@ -118,21 +167,29 @@ func (h *Hub) HandleWS(w http.ResponseWriter, r *http.Request) {
 		hub:  h,
 	}
 
-	h.register(client)
+	// Queue the assigned client ID before registering, so a concurrent
+	// Close cannot have closed client.send yet
+	client.send <- welcomeMessage(client.ID)
 
-	// Send the assigned client ID to the newly connected client
-	welcome := map[string]string{
-		"type":      "connected",
-		"client_id": client.ID,
+	if !h.register(client) {
+		conn.Close()
+		return
 	}
-	welcomeData, _ := json.Marshal(welcome)
-	client.send <- welcomeData
 
 	// Start read/write pumps
 	go client.writePump()
 	go client.readPump()
 }
 
+// welcomeMessage builds the "connected" message for the given client ID.
+// IDs are UUIDs, so they are copied in without JSON escaping.
+func welcomeMessage(id string) []byte {
+	msg := make([]byte, 0, len(welcomePrefix)+len(id)+len(welcomeSuffix))
+	msg = append(msg, welcomePrefix...)
+	msg = append(msg, id...)
+	return append(msg, welcomeSuffix...)
+}
+
 // readPump reads messages from the WebSocket connection.
 // It handles pong messages for keep-alive and cleans up on disconnect.
 func (c *Client) readPump() {
@@ -166,6 +223,7 @@ func (c *Client) writePump() {
 	defer func() {
 		ticker.Stop()
 		c.conn.Close()
+		c.hub.pumps.Done()
 	}()
 
 	for {
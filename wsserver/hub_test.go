@@ -0,0 +1,218 @@
+package wsserver
+
+import (
+	"context"
+	"encoding/json"
+	"errors"
+	"net/http"
+	"net/http/httptest"
+	"strings"
+	"sync"
+	"testing"
+	"time"
+
+	"github.com/gorilla/websocket"
+)
+
+// newTestServer serves h.HandleWS on a local test server.
+func newTestServer(t *testing.T, h *Hub) *httptest.Server {
+	t.Helper()
+	srv := httptest.NewServer(http.HandlerFunc(h.HandleWS))
+	t.Cleanup(srv.Close)
+	return srv
+}
+
+// dial connects a WS client to srv.
+func dial(t *testing.T, srv *httptest.Server) *websocket.Conn {
+	t.Helper()
+	conn, _, err := websocket.DefaultDialer.Dial("ws"+strings.TrimPrefix(srv.URL, "http"), nil)
+	if err != nil {
+		t.Fatalf("dial: %v", err)
+	}
+	t.Cleanup(func() { conn.Close() })
+	conn.SetReadDeadline(time.Now().Add(5 * time.Second))
+	return conn
+}
+
+// readWelcome reads the "connected" message and returns the client ID.
+func readWelcome(t *testing.T, conn *websocket.Conn) string {
+	t.Helper()
+	_, data, err := conn.ReadMessage()
+	if err != nil {
+		t.Fatalf("read welcome: %v", err)
+	}
+	var welcome struct {
+		Type     string `json:"type"`
+		ClientID string `json:"client_id"`
+	}
+	if err := json.Unmarshal(data, &welcome); err != nil {
+		t.Fatalf("parse welcome %s: %v", data, err)
+	}
+	if welcome.Type != "connected" || welcome.ClientID == "" {
+		t.Fatalf("unexpected welcome: %s", data)
+	}
+	return welcome.ClientID
+}
+
+func clientTotal(h *Hub) int {
+	h.mu.RLock()
+	defer h.mu.RUnlock()
+	return len(h.clients)
+}
+
+func TestCloseSendsCloseFrame(t *testing.T) {
+	h := NewHub()
+	conn := dial(t, newTestServer(t, h))
+	readWelcome(t, conn)
+
+	ctx, cancel := context.WithTimeout(context.Background(), 5*time.Second)
+	defer cancel()
+	// Close only returns nil once the client's writePump has exited
+	if err := h.Close(ctx); err != nil {
+		t.Fatalf("Close returned %v, want nil", err)
+	}
+	if n := clientTotal(h); n != 0 {
+		t.Fatalf("%d clients still registered after Close", n)
+	}
+
+	_, _, err := conn.ReadMessage()
+	var closeErr *websocket.CloseError
+	if !errors.As(err, &closeErr) || closeErr.Code == websocket.CloseAbnormalClosure {
+		t.Fatalf("client read %v, want a close frame", err)
+	}
+}
+
+func TestHandleWSAfterCloseRefusesClient(t *testing.T) {
+	h := NewHub()
+	srv := newTestServer(t, h)
+	if err := h.Close(context.Background()); err != nil {
+		t.Fatalf("Close returned %v", err)
+	}
+
+	conn := dial(t, srv)
+	// The connection is dropped without a welcome message
+	if _, data, err := conn.ReadMessage(); err == nil {
+		t.Fatalf("refused client received %s", data)
+	}
+	if n := clientTotal(h); n != 0 {
+		t.Fatalf("%d clients registered after Close", n)
+	}
+}
+
+func TestCloseReturnsCtxErrWhenPumpDoesNotExit(t *testing.T) {
+	h := NewHub()
+	h.pumps.Add(1) // stands in for a writePump stuck on a write
+	defer h.pumps.Done()
+
+	ctx, cancel := context.WithTimeout(context.Background(), 50*time.Millisecond)
+	defer cancel()
+	if err := h.Close(ctx); !errors.Is(err, context.DeadlineExceeded) {
+		t.Fatalf("Close returned %v, want %v", err, context.DeadlineExceeded)
+	}
+}
+
+// marshalSpy records whether it was marshalled.
+type marshalSpy struct{ called *bool }
+
+func (m marshalSpy) MarshalJSON() ([]byte, error) {
+	*m.called = true
+	return []byte(`{}`), nil
+}
+
+func TestSendToClientMissingClientSkipsMarshal(t *testing.T) {
+	h := NewHub()
+	var called bool
+	err := h.SendToClient("missing", marshalSpy{called: &called})
+	if err == nil || !strings.Contains(err.Error(), "not found") {
+		t.Fatalf("SendToClient returned %v, want a not found error", err)
+	}
+	if called {
+		t.Fatal("message was marshalled for a missing client")
+	}
+}
+
+// disconnects are the ways a client can go away while being sent to.
+var disconnects = map[string]func(h *Hub, id string){
+	"unregister": func(h *Hub, id string) { h.unregister(id) },
+	"Close":      func(h *Hub, id string) { h.Close(context.Background()) },
+}
+
+// registerTestClient registers a connectionless client whose send channel
+// is drained in place of a writePump.
+func registerTestClient(t *testing.T, h *Hub) *Client {
+	t.Helper()
+	c := &Client{ID: "c", send: make(chan []byte, 4), hub: h}
+	if !h.register(c) {
+		t.Fatal("register refused a client on an open hub")
+	}
+	go func() {
+		for range c.send {
+		}
+		h.pumps.Done()
+	}()
+	return c
+}
+
+// blockingMessage holds SendToClient inside json.Marshal until released.
+type blockingMessage struct {
+	inMarshal chan<- struct{}
+	release   <-chan struct{}
+}
+
+func (m blockingMessage) MarshalJSON() ([]byte, error) {
+	m.inMarshal <- struct{}{}
+	<-m.release
+	return []byte(`{}`), nil
+}
+
+// TestSendToClientDisconnectDuringMarshal disconnects the client while
+// SendToClient is marshalling. Sending on the channel unregister closed
+// would panic; the send must report the client as gone instead.
+func TestSendToClientDisconnectDuringMarshal(t *testing.T) {
+	for name, disconnect := range disconnects {
+		t.Run(name, func(t *testing.T) {
+			h := NewHub()
+			c := registerTestClient(t, h)
+
+			inMarshal := make(chan struct{})
+			release := make(chan struct{})
+			errc := make(chan error, 1)
+			go func() {
+				errc <- h.SendToClient(c.ID, blockingMessage{inMarshal: inMarshal, release: release})
+			}()
+
+			<-inMarshal
+			disconnect(h, c.ID)
+			close(release)
+
+			if err := <-errc; err == nil || !strings.Contains(err.Error(), "not found") {
+				t.Fatalf("SendToClient returned %v, want a not found error", err)
+			}
+		})
+	}
+}
+
+// TestSendToClientRacesDisconnect hammers SendToClient while the client is
+// unregistered or the hub is closed; run with -race.
+func TestSendToClientRacesDisconnect(t *testing.T) {
+	for name, disconnect := range disconnects {
+		t.Run(name, func(t *testing.T) {
+			for i := 0; i < 200; i++ {
+				h := NewHub()
+				c := registerTestClient(t, h)
+
+				var senders sync.WaitGroup
+				for j := 0; j < 4; j++ {
+					senders.Add(1)
+					go func() {
+						defer senders.Done()
+						for h.SendToClient(c.ID, "msg") == nil {
+						}
+					}()
+				}
+				disconnect(h, c.ID)
+				senders.Wait()
+			}
+		})
+	}
+}